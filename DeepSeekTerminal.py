@@ -3,7 +3,7 @@
 📌 功能概览
 功能	           说明
 ✅ 图形化终端界面	使用 Rich + Textual 实现，支持输入框、按钮、侧边栏、滚动区域等
-✅ 聊天历史管理	    每个聊天自动保存为 JSON 文件，可查看、加载、删除
+✅ 聊天历史管理	    每个聊天自动保存为 JSONL 文件（逐条追加），可查看、加载、删除
 ✅ Markdown        渲染	AI 回复使用 Markdown 高亮展示，支持格式、代码块等
 ✅ API 接入	       接入 DeepSeek 官方 API, 可配置 API 密钥，支持保存
 ✅ 键盘快捷操作	    支持 Ctrl+N 新建、Ctrl+D 删除聊天等快捷方式
@@ -12,9 +12,18 @@
 
 import os  # 导入操作系统相关模块
 import json  # 导入 JSON 处理模块
+import time  # 导入时间模块
+import sqlite3  # 导入 SQLite 模块
+import hashlib  # 导入哈希模块
+import asyncio  # 导入异步模块
+import threading  # 导入线程模块
+import unicodedata  # 导入 Unicode 字符属性模块
+from collections import OrderedDict  # 导入有序字典
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池
 from pathlib import Path  # 导入路径处理模块
 from datetime import datetime  # 导入日期时间模块
-from typing import List, Dict, Optional, Tuple  # 导入类型注解
+from functools import lru_cache  # 导入 LRU 缓存装饰器
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Union  # 导入类型注解
 import httpx  # 导入 HTTP 客户端库
 from rich.console import Console  # 导入 Rich 控制台
 from rich.panel import Panel  # 导入 Rich 面板
@@ -22,7 +31,8 @@ from rich.markdown import Markdown  # 导入 Rich Markdown 渲染
 from rich.text import Text  # 导入 Rich 文本
 from textual import work, on  # 导入 Textual 装饰器
 from textual.app import App, ComposeResult  # 导入 Textual 应用基类和组合结果
-from textual.containers import VerticalScroll, Horizontal, Container  # 导入容器控件
+from textual.containers import VerticalScroll, Horizontal, Vertical, Container  # 导入容器控件
+from textual.screen import ModalScreen  # 导入模态屏幕基类
 from textual.widgets import (  # 导入常用控件
     Button,
     Header,
@@ -37,202 +47,807 @@ from textual.widgets import (  # 导入常用控件
 from textual.reactive import reactive  # 导入响应式变量
 from textual.message import Message  # 导入消息基类
 
+try:  # 可选依赖 orjson，序列化速度远快于标准库 json
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # HTTP/2 需要可选依赖 h2（pip install "httpx[http2]"）
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # 配置常量
 CONFIG_DIR = Path.home() / ".deepseek_terminal"  # 配置文件夹路径
 CONFIG_FILE = CONFIG_DIR / "config.json"         # 配置文件路径
 CHAT_HISTORY_DIR = CONFIG_DIR / "chats"          # 聊天记录文件夹
+META_SUFFIX = ".meta.json"                       # 聊天元数据文件后缀
+CHAT_INDEX_DB = CONFIG_DIR / "chats.db"          # 聊天列表索引数据库
+RESPONSE_CACHE_DIR = CONFIG_DIR / "response_cache"  # API 回复缓存文件夹
+RESPONSE_CACHE_SIZE = 128                        # 内存中缓存的回复条数上限
+RESPONSE_CACHE_DISK_SIZE = RESPONSE_CACHE_SIZE * 8  # 磁盘上缓存的回复文件数上限
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"  # DeepSeek API 地址
 DEFAULT_MODEL = "deepseek-chat"                  # 默认模型名称
+MAX_CONTEXT_MESSAGES = 20                        # 每次请求最多携带的历史消息条数
+MAX_CONTEXT_CHARS = 24000                        # 每次请求携带的历史消息总字符数上限
 
 # 确保配置目录存在
 CONFIG_DIR.mkdir(parents=True, exist_ok=True)  # 创建配置目录（如不存在）
 CHAT_HISTORY_DIR.mkdir(parents=True, exist_ok=True)  # 创建聊天历史目录
+RESPONSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)  # 创建回复缓存目录
 
 # 初始化控制台
 console = Console()  # Rich 控制台对象
 
+def _json_dumps(obj, pretty: bool = False) -> bytes:
+    """序列化为 UTF-8 字节串，优先使用 orjson，未安装时回退到标准库 json"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None).encode("utf-8")
+
+def _json_loads(data: Union[bytes, str]):
+    """解析 JSON，优先使用 orjson（解析失败时同样抛出 json.JSONDecodeError）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _hangul_type(ch: str) -> Optional[str]:
+    """返回韩文字母的组合类型：L（初声）、V（中声）、T（终声）、LV / LVT（整字），其他字符返回 None"""
+    cp = ord(ch)
+    if 0x1100 <= cp <= 0x115F or 0xA960 <= cp <= 0xA97C:
+        return "L"
+    if 0x1160 <= cp <= 0x11A7 or 0xD7B0 <= cp <= 0xD7C6:
+        return "V"
+    if 0x11A8 <= cp <= 0x11FF or 0xD7CB <= cp <= 0xD7FB:
+        return "T"
+    if 0xAC00 <= cp <= 0xD7A3:
+        return "LV" if (cp - 0xAC00) % 28 == 0 else "LVT"
+    return None
+
+def _is_regional_indicator(ch: str) -> bool:
+    """是否为国旗表情使用的区域指示符号"""
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+def _is_grapheme_break(text: str, index: int) -> bool:
+    """
+    判断 text[index - 1] 与 text[index] 之间能否断开（简化的 Unicode 字素簇边界规则）。
+    不会拆开组合字符、变体选择符、肤色修饰符、ZWJ 连接的表情、国旗符号对和韩文字母组合。
+    """
+    if index <= 0 or index >= len(text):
+        return True
+    prev, cur = text[index - 1], text[index]
+    cp = ord(cur)
+    if (
+        unicodedata.category(cur) in ("Mn", "Me", "Mc")  # 组合字符
+        or cur == "\u200d"  # ZWJ
+        or 0xFE00 <= cp <= 0xFE0F or 0xE0100 <= cp <= 0xE01EF  # 变体选择符
+        or 0x1F3FB <= cp <= 0x1F3FF  # 肤色修饰符
+        or 0xE0020 <= cp <= 0xE007F  # 旗帜标签字符
+    ):
+        return False
+    if prev == "\u200d":  # ZWJ 之后
+        return False
+    prev_hangul, cur_hangul = _hangul_type(prev), _hangul_type(cur)
+    if prev_hangul == "L" and cur_hangul in ("L", "V", "LV", "LVT"):
+        return False
+    if prev_hangul in ("LV", "V") and cur_hangul in ("V", "T"):
+        return False
+    if prev_hangul in ("LVT", "T") and cur_hangul == "T":
+        return False
+    if _is_regional_indicator(prev) and _is_regional_indicator(cur):
+        count = 0  # 之前连续的区域指示符号数，奇数时当前符号与前一个组成一面国旗
+        while index - count - 1 >= 0 and _is_regional_indicator(text[index - count - 1]):
+            count += 1
+        return count % 2 == 0
+    return True
+
+def _format_time(timestamp: Union[float, str, None], fmt: str = "%H:%M:%S") -> str:
+    """
+    格式化消息时间戳，仅在展示时调用。
+    兼容新版的 Unix 时间戳（float）和旧版的 ISO 字符串，缺失时使用当前时间。
+    """
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp).strftime(fmt)
+    if timestamp:
+        return datetime.fromisoformat(timestamp).strftime(fmt)
+    return datetime.now().strftime(fmt)
+
+class DeepSeekAPIError(Exception):
+    """DeepSeek API 请求失败（HTTP 错误或网络错误）"""
+
+
 class DeepSeekClient:
     """
     DeepSeek API 客户端，负责与 DeepSeek 后端进行 HTTP 通信。
+    同一 API 密钥的所有实例共享进程内唯一的异步连接池（请求头随连接池预先设置），
+    后续请求无需重新握手，也不会阻塞界面事件循环。
+    相同的消息历史直接返回缓存的回复（内存 LRU + 磁盘），避免重复请求。
+    磁盘缓存以明文保存在 RESPONSE_CACHE_DIR，最多 RESPONSE_CACHE_DISK_SIZE 个文件，
+    按最近使用时间淘汰；删除聊天不会清除其中的回复。
     """
+    _shared_clients: Dict[str, httpx.AsyncClient] = {}  # API 密钥 -> 进程内共享的连接池
+    _shared_refs: Dict[str, int] = {}  # API 密钥 -> 使用该连接池的实例数
+
     def __init__(self, api_key: str):
         self.api_key = api_key  # 保存 API 密钥
         self.base_url = DEEPSEEK_API_URL  # API 基础地址
+        self._url = httpx.URL(self.base_url)  # 预先解析的请求地址
         self.headers = {  # 请求头
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         self.model = DEFAULT_MODEL  # 默认模型
-        
-    def chat(self, messages: List[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+        self._client = self._acquire_client(api_key, self.headers)  # 共享的异步连接池
+        self._closed = False  # 是否已释放连接池
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()  # 回复缓存（LRU）
+        self._cache_cap = RESPONSE_CACHE_SIZE  # 缓存条数上限
+
+    @classmethod
+    def _acquire_client(cls, api_key: str, headers: Dict[str, str]) -> httpx.AsyncClient:
+        """获取该 API 密钥对应的共享连接池，不存在或已关闭时新建"""
+        client = cls._shared_clients.get(api_key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                headers=headers,
+                http2=HTTP2_AVAILABLE,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=4)
+            )
+            cls._shared_clients[api_key] = client
+            cls._shared_refs[api_key] = 0
+        cls._shared_refs[api_key] += 1
+        return client
+
+    async def aclose(self):
+        """释放共享连接池，最后一个使用者负责关闭，应用退出时调用"""
+        if self._closed:
+            return
+        self._closed = True
+        refs = self._shared_refs.get(self.api_key, 1) - 1
+        if refs > 0:  # 仍有其他实例在使用
+            self._shared_refs[self.api_key] = refs
+            return
+        self._shared_refs.pop(self.api_key, None)
+        self._shared_clients.pop(self.api_key, None)
+        await self._client.aclose()
+
+    async def _cache_get(self, key: bytes) -> Optional[str]:
+        """查询回复缓存，内存未命中时在后台线程中读取磁盘缓存，不阻塞界面事件循环"""
+        if key in self._cache:
+            self._cache.move_to_end(key)  # 标记为最近使用
+            return self._cache[key]
+        content = await asyncio.to_thread(self._read_disk_cache, key)
+        if content is not None:
+            self._cache_put(key, content)
+        return content
+
+    def _cache_put(self, key: bytes, content: str):
+        """写入内存回复缓存，超出上限时淘汰最久未使用的条目"""
+        self._cache[key] = content
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_cap:
+            self._cache.popitem(last=False)
+
+    async def _cache_store(self, key: bytes, content: str):
+        """写入回复缓存，磁盘写入与淘汰在后台线程中执行"""
+        self._cache_put(key, content)
+        await asyncio.to_thread(self._write_disk_cache, key, content)
+
+    @staticmethod
+    def _read_disk_cache(key: bytes) -> Optional[str]:
+        """读取磁盘缓存，不存在或读取失败时返回 None"""
+        cache_file = RESPONSE_CACHE_DIR / key.hex()
+        try:
+            content = cache_file.read_text(encoding="utf-8")
+            os.utime(cache_file)  # 更新修改时间，淘汰时视为最近使用
+        except OSError:
+            return None
+        return content
+
+    @classmethod
+    def _write_disk_cache(cls, key: bytes, content: str):
+        """写入磁盘缓存并淘汰超出上限的旧文件"""
+        try:
+            (RESPONSE_CACHE_DIR / key.hex()).write_text(content, encoding="utf-8")
+            cls._prune_disk_cache()
+        except OSError:
+            pass  # 磁盘缓存写入失败不影响对话
+
+    @staticmethod
+    def _prune_disk_cache():
+        """磁盘缓存超出 RESPONSE_CACHE_DISK_SIZE 时，按修改时间删除最旧的文件"""
+        files = list(RESPONSE_CACHE_DIR.iterdir())
+        if len(files) <= RESPONSE_CACHE_DISK_SIZE:
+            return
+        mtimes = {}
+        for file in files:
+            try:
+                mtimes[file] = file.stat().st_mtime
+            except OSError:
+                continue  # 已被其他进程删除
+        for file in sorted(mtimes, key=mtimes.get)[:len(mtimes) - RESPONSE_CACHE_DISK_SIZE]:
+            try:
+                file.unlink()
+            except OSError:
+                continue
+
+    @staticmethod
+    def _context_window(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        截取发送给 API 的上下文：保留开头的 system 消息，以及从最新消息往前、
+        不超过 MAX_CONTEXT_MESSAGES 条且总字符数不超过 MAX_CONTEXT_CHARS 的消息。
+        最新一条消息无论长短都会保留。
+        """
+        system = [m for m in messages if m["role"] == "system"]
+        kept = []  # 倒序收集
+        total_chars = 0
+        for msg in reversed(messages):
+            if msg["role"] == "system":
+                continue
+            if kept and (len(kept) >= MAX_CONTEXT_MESSAGES or total_chars + len(msg["content"]) > MAX_CONTEXT_CHARS):
+                break
+            kept.append(msg)
+            total_chars += len(msg["content"])
+        kept.reverse()
+        return system + kept
+
+    async def chat(self, messages: List[Dict[str, str]], use_cache: bool = True) -> AsyncIterator[str]:
         """
-        向 DeepSeek API 发送聊天消息，返回 AI 回复内容和错误信息。
-        :param messages: 聊天消息历史，格式为 [{role:..., content:...}, ...]
-        :return: (回复内容, 错误信息)
+        以流式方式向 DeepSeek API 发送聊天消息，逐段产出 AI 回复内容。
+        :param messages: 聊天消息历史，格式为 [{role:..., content:...}, ...]，超出上下文窗口的旧消息不会发送
+        :param use_cache: 是否使用缓存的回复，重新生成时传 False
+        :return: 异步迭代器，每次产出一段增量文本（命中缓存时一次产出完整回复）
+        :raises DeepSeekAPIError: HTTP 错误或网络错误
         """
+        api_messages = [  # 只发送窗口内消息的角色和内容
+            {"role": m["role"], "content": m["content"]} for m in self._context_window(messages)
+        ]
+        key = hashlib.blake2b(_json_dumps([self.model, api_messages]), digest_size=16).digest()  # 缓存键
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:  # 命中缓存，无需请求
+                yield cached
+                return
+
         payload = {  # 构造请求体
             "model": self.model,
-            "messages": messages,
+            "messages": api_messages,
             "temperature": 0.7,
             "max_tokens": 2000,
-            "stream": False
+            "stream": True
         }
+        parts = []  # 已收到的回复片段
         try:
-            response = httpx.post(  # 发送 POST 请求
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30.0
-            )
-            response.raise_for_status()  # 检查 HTTP 状态码
-            data = response.json()  # 解析响应 JSON
-            if "choices" in data and data["choices"]:  # 检查 choices 字段
-                choice = data["choices"][0]  # 取第一个回复
-                if "message" in choice and "content" in choice["message"]:  # 检查内容
-                    return choice["message"]["content"], None  # 返回内容
-            return None, "API响应中没有找到回复内容"  # 未找到内容
-        except httpx.HTTPStatusError as e:
-            return None, f"API错误: {e.response.status_code} - {e.response.text}"  # HTTP 错误
+            async with self._client.stream("POST", self._url, json=payload) as response:  # 发送流式请求
+                if response.is_error:  # 检查 HTTP 状态码
+                    await response.aread()  # 读取错误详情
+                    raise DeepSeekAPIError(f"API错误: {response.status_code} - {response.text}")
+                async for line in response.aiter_lines():  # 逐行解析 SSE 数据
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":  # 流结束标记
+                        break
+                    choices = _json_loads(data).get("choices")
+                    if choices:  # 取第一个回复的增量内容
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield delta
         except httpx.RequestError as e:
-            return None, f"网络请求错误: {str(e)}"  # 网络错误
-        except Exception as e:
-            return None, f"未知错误: {str(e)}"  # 其他异常
+            raise DeepSeekAPIError(f"网络请求错误: {str(e)}") from e  # 网络错误
+
+        if parts:  # 完整接收后写入缓存
+            await self._cache_store(key, "".join(parts))
 
 class ChatHistory:
     """
     聊天历史管理类，负责聊天记录的创建、保存、加载、删除等操作。
-    聊天记录以 JSON 文件形式存储在本地。
+    聊天记录以 JSONL 文件形式存储在本地：首行为会话元数据，之后每行一条消息（仅追加写入）。
+    标题、消息数、时间等简要信息另存于 <chat_id>.meta.json，并汇总到 SQLite 索引，
+    侧边栏刷新只需一次查询；启动时仅重新解析修改时间变化的文件。
+    旧版的整文件 JSON 格式仍可读取，继续对话时会自动迁移为 JSONL。
     """
     def __init__(self):
         self.storage_dir = CHAT_HISTORY_DIR  # 聊天记录目录
         self.storage_dir.mkdir(parents=True, exist_ok=True)  # 确保目录存在
         self.current_chat_id = None  # 当前聊天 ID
         self.current_chat = []  # 当前聊天内容
-        
+        self._created_iso = None  # 当前聊天创建时间
+        self._title = None  # 当前聊天标题（第一条用户消息）
+        self._save_pending = False  # 元数据是否有待写入的修改
+        self._pending_messages: List[Dict] = []  # 尚未写入文件的消息
+        self._write_lock = threading.RLock()  # 保护当前聊天状态与索引，写入可能在后台线程进行
+        self._list_cache: Optional[List[Dict]] = None  # 聊天列表缓存
+        self.db = sqlite3.connect(  # 聊天列表索引（后台线程写入时由 _write_lock 串行化）
+            CHAT_INDEX_DB, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS chats("
+            "id TEXT PRIMARY KEY, title TEXT, created TEXT, modified TEXT, message_count INTEGER, mtime REAL)"
+        )
+        self._sync_index()  # 与磁盘上的聊天文件对齐
+
+    def _chat_file(self, chat_id: str) -> Path:
+        """聊天记录文件路径（JSONL）"""
+        return self.storage_dir / f"{chat_id}.jsonl"
+
+    def _legacy_chat_file(self, chat_id: str) -> Path:
+        """旧版聊天记录文件路径（整文件 JSON）"""
+        return self.storage_dir / f"{chat_id}.json"
+
+    def _meta_file(self, chat_id: str) -> Path:
+        """聊天元数据文件路径（标题、消息数、时间）"""
+        return self.storage_dir / f"{chat_id}{META_SUFFIX}"
+
+    @staticmethod
+    def _make_title(content: str, width: int = 30) -> str:
+        """
+        由第一条用户消息生成聊天标题（仅在添加第一条用户消息时计算一次，随元数据保存）。
+        合并空白后超出 width 时截断并加省略号，截断点总落在字素簇边界上（见 _is_grapheme_break）。
+        """
+        title = " ".join(content.split())  # 合并换行与连续空白
+        if len(title) <= width:
+            return title
+        cut = width - 1  # 为省略号留出位置
+        while cut > 0 and not _is_grapheme_break(title, cut):
+            cut -= 1  # 向前退到完整字素簇的边界
+        return title[:cut].rstrip() + "…"
+
+    def _read_chat_file(self, path: Path) -> Dict:
+        """
+        读取聊天文件，统一返回 {id, messages, created, last_modified}。
+        同时支持 JSONL 与旧版 JSON 格式。JSONL 末行若因追加写入中断而不完整则忽略。
+        """
+        with open(path, "rb") as f:
+            if path.suffix == ".json":  # 旧版格式
+                return _json_loads(f.read())
+
+            meta = _json_loads(f.readline())  # 首行为会话元数据
+            messages = []
+            torn = False  # 是否遇到无法解析的行
+            for line in f:  # 其余每行一条消息
+                line = line.strip()
+                if not line:
+                    continue
+                if torn:  # 损坏的行不在末尾，文件确实已损坏
+                    raise ValueError(f"聊天文件包含损坏的行: {path}")
+                try:
+                    obj = _json_loads(line)
+                except ValueError:
+                    torn = True  # 可能是写入中断留下的残缺末行
+                    continue
+                messages.append({
+                    "role": obj["role"],
+                    "content": obj["content"],
+                    "timestamp": obj.get("timestamp")
+                })
+        last_timestamp = messages[-1]["timestamp"] if messages else None
+        return {
+            "id": meta["id"],
+            "messages": messages,
+            "created": meta.get("created"),
+            "last_modified": (
+                _format_time(last_timestamp, "%Y-%m-%dT%H:%M:%S") if last_timestamp else meta.get("created")
+            )
+        }
+
     def new_chat(self) -> str:
         """创建新聊天并返回聊天ID(以时间戳命名)"""
-        chat_id = datetime.now().strftime("%Y%m%d_%H%M%S")  # 生成唯一聊天 ID
-        self.current_chat_id = chat_id  # 设置当前聊天 ID
-        self.current_chat = []  # 清空当前聊天内容
+        self.flush()  # 先写入上一个聊天的元数据
+        chat_id = base_id = datetime.now().strftime("%Y%m%d_%H%M%S")  # 以时间戳生成聊天 ID
+        suffix = 1
+        while self._chat_file(chat_id).exists() or self._legacy_chat_file(chat_id).exists():
+            suffix += 1  # 同一秒内已有聊天，加序号避免追加到其记录中
+            chat_id = f"{base_id}_{suffix}"
+        with self._write_lock:  # 避免与后台写入交错
+            self.current_chat_id = chat_id  # 设置当前聊天 ID
+            self.current_chat = []  # 清空当前聊天内容
+            self._created_iso = datetime.now().isoformat()  # 记录创建时间
+            self._title = None  # 标题待第一条用户消息确定
+            self._list_cache = None  # 使聊天列表缓存失效
         return chat_id  # 返回新聊天 ID
-        
+
     def save_chat(self):
-        """保存当前聊天到文件（仅当有聊天内容时）"""
+        """
+        保存当前聊天的元数据文件（仅当有聊天内容时）。
+        消息本身逐条追加写入 JSONL，无需整体重写。由 flush 在持有写锁时调用。
+        """
         if not self.current_chat_id or not self.current_chat:  # 没有内容不保存
             return
-            
-        chat_file = self.storage_dir / f"{self.current_chat_id}.json"  # 聊天文件路径
-        with open(chat_file, "w", encoding="utf-8") as f:  # 打开文件写入
-            json.dump({
+
+        self._write_meta({
+            "id": self.current_chat_id,
+            "title": self._title or "新聊天",
+            "created": self._created_iso,
+            "last_modified": datetime.now().isoformat(),
+            "message_count": len(self.current_chat)
+        })
+
+    def _write_meta(self, meta: Dict):
+        """原子写入单个聊天的元数据文件，并同步更新索引"""
+        meta_file = self._meta_file(meta["id"])  # 元数据文件路径
+        tmp_file = meta_file.with_name(meta_file.name + ".tmp")  # 先写临时文件
+        with open(tmp_file, "wb") as f:
+            f.write(_json_dumps(meta))
+        os.replace(tmp_file, meta_file)  # 原子替换，避免写入中断导致文件损坏
+        self._index_chat(meta, meta_file.stat().st_mtime)  # 同步更新索引
+
+    def flush(self):
+        """
+        将排队的消息追加写入文件，并写入待保存的元数据。
+        多次 add_message_sync 的结果在一次 flush 中合并写入；可在后台线程中调用。
+        """
+        with self._write_lock:
+            if self._pending_messages:
+                self._append_messages(self._pending_messages)
+                self._pending_messages = []
+            if self._save_pending:
+                self._save_pending = False
+                self.save_chat()
+
+    async def persist(self):
+        """在后台线程中执行 flush，不阻塞界面事件循环"""
+        await asyncio.to_thread(self.flush)
+
+    @staticmethod
+    def _append_lines(chat_file: Path, messages: List[Dict]) -> bool:
+        """
+        向已有的 JSONL 文件追加消息行，返回是否成功追加。
+        追加前截掉写入中断留下的残缺末行，避免新消息与其拼接在一起；
+        文件不存在或连元数据行都不完整时返回 False，需整体重写。
+        """
+        if not chat_file.exists():
+            return False
+        with open(chat_file, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end > 0:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":  # 末行不完整，向前找到最后一个换行符并截断
+                    pos = end
+                    while pos > 0:
+                        step = min(65536, pos)
+                        pos -= step
+                        f.seek(pos)
+                        index = f.read(step).rfind(b"\n")
+                        if index != -1:
+                            end = pos + index + 1
+                            break
+                    else:
+                        end = 0
+                    f.truncate(end)
+            if end == 0:
+                return False
+            f.seek(end)
+            f.write(b"".join(_json_dumps({"type": "message", **msg}) + b"\n" for msg in messages))
+        return True
+
+    def _append_messages(self, messages: List[Dict]):
+        """
+        将消息追加到 JSONL 文件末尾。
+        文件不存在时（新聊天或旧版 JSON 聊天）先写入元数据行和当前聊天的全部消息，完成迁移。
+        """
+        chat_file = self._chat_file(self.current_chat_id)  # 聊天文件路径
+        if self._append_lines(chat_file, messages):
+            return
+
+        tmp_file = chat_file.with_name(chat_file.name + ".tmp")  # 先写临时文件
+        with open(tmp_file, "wb") as f:  # 首次写入
+            f.write(_json_dumps({
+                "type": "session_metadata",
                 "id": self.current_chat_id,
-                "messages": self.current_chat,
-                "created": datetime.now().isoformat(),
-                "last_modified": datetime.now().isoformat()
-            }, f, ensure_ascii=False, indent=2)
-    
+                "created": self._created_iso or datetime.now().isoformat()
+            }) + b"\n")
+            for msg in self.current_chat:  # 包含排队中的消息
+                f.write(_json_dumps({"type": "message", **msg}) + b"\n")
+        os.replace(tmp_file, chat_file)  # 原子替换
+
+        legacy_file = self._legacy_chat_file(self.current_chat_id)
+        if legacy_file.exists():  # 迁移完成后移除旧版文件
+            legacy_file.unlink()
+
     def load_chat(self, chat_id: str) -> bool:
         """加载指定聊天ID的聊天内容到当前会话"""
-        chat_file = self.storage_dir / f"{chat_id}.json"  # 聊天文件路径
+        self.flush()  # 先写入上一个聊天的元数据
+        chat_file = self._chat_file(chat_id)  # 聊天文件路径
+        if not chat_file.exists():
+            chat_file = self._legacy_chat_file(chat_id)  # 回退到旧版格式
         if chat_file.exists():  # 文件存在
             try:
-                with open(chat_file, "r", encoding="utf-8") as f:  # 打开文件读取
-                    data = json.load(f)  # 解析 JSON
+                data = self._read_chat_file(chat_file)  # 解析聊天文件
+                with self._write_lock:  # 避免与后台写入交错
                     self.current_chat_id = data["id"]  # 设置当前聊天 ID
                     self.current_chat = data["messages"]  # 设置当前聊天内容
-                    return True  # 加载成功
-            except:
+                    self._created_iso = data.get("created")  # 保留原创建时间
+                    self._title = next(  # 第一条用户消息作为标题
+                        (self._make_title(msg["content"]) for msg in self.current_chat if msg["role"] == "user"),
+                        None
+                    )
+                return True  # 加载成功
+            except (OSError, ValueError, KeyError, TypeError):  # 读取失败或文件内容损坏
                 return False  # 加载失败
         return False  # 文件不存在
-    
+
+    def _chat_summary(self, file: Path) -> Dict:
+        """
+        提取单个聊天的简要信息 {id, title, created, last_modified, message_count}。
+        传入元数据文件时直接读取；传入聊天文件时（旧版或缺少元数据）需完整解析。
+        """
+        if file.name.endswith(META_SUFFIX):  # 元数据文件，无需扫描消息
+            with open(file, "rb") as f:
+                return _json_loads(f.read())
+
+        data = self._read_chat_file(file)  # 解析聊天文件
+
+        # 获取第一条用户消息作为标题
+        title = "新聊天"
+        for msg in data["messages"]:
+            if msg["role"] == "user":
+                title = self._make_title(msg["content"])
+                break
+
+        return {
+            "id": data["id"],
+            "title": title,
+            "created": data.get("created"),
+            "last_modified": data.get("last_modified"),
+            "message_count": len(data["messages"])
+        }
+
+    def _index_chat(self, meta: Dict, mtime: float):
+        """写入或更新单个聊天在索引中的记录"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO chats(id, title, created, modified, message_count, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                meta["id"],
+                meta.get("title") or "新聊天",
+                meta.get("created") or "2023-01-01T00:00:00",
+                meta.get("last_modified") or meta.get("created") or "2023-01-01T00:00:00",
+                meta.get("message_count", 0),
+                mtime
+            )
+        )
+
+    @staticmethod
+    def _is_valid_summary(summary, chat_id: str) -> bool:
+        """检查简要信息的结构是否可以写入索引，避免损坏的文件中断整个同步"""
+        if not isinstance(summary, dict) or summary.get("id") != chat_id:
+            return False
+        if any(not isinstance(summary.get(key), (str, type(None))) for key in ("title", "created", "last_modified")):
+            return False
+        count = summary.get("message_count", 0)
+        return isinstance(count, int) and not isinstance(count, bool)
+
+    def _parse_one(self, chat_id: str, file: Path, indexed_mtime: Optional[float]) -> Optional[Tuple[Dict, float]]:
+        """
+        检查单个聊天文件，返回需要写入索引的 (简要信息, 修改时间)。
+        优先读取元数据文件，元数据损坏或结构不对时回退到解析聊天文件。
+        文件未变化、内容过短或解析失败时返回 None。可在线程池中并发调用。
+        """
+        try:
+            stat = file.stat()
+            if stat.st_size < 10:  # 空文件或写入中断的文件，无需解析
+                return None
+            mtime = stat.st_mtime  # 文件修改时间
+            meta_file = self._meta_file(chat_id)
+            if meta_file.exists() and meta_file.stat().st_mtime >= mtime:  # 元数据不旧于聊天文件
+                meta_mtime = meta_file.stat().st_mtime
+                if indexed_mtime == meta_mtime:  # 文件未变化，沿用索引
+                    return None
+                try:
+                    summary = self._chat_summary(meta_file)
+                except (OSError, ValueError):
+                    summary = None
+                if self._is_valid_summary(summary, chat_id):
+                    return summary, meta_mtime
+            if indexed_mtime == mtime:  # 文件未变化，沿用索引
+                return None
+            summary = self._chat_summary(file)
+            return (summary, mtime) if self._is_valid_summary(summary, chat_id) else None
+        except (OSError, ValueError, KeyError, TypeError):  # 读取失败或文件内容损坏
+            return None  # 解析失败跳过
+
+    def _sync_index(self):
+        """
+        对照磁盘上的聊天文件同步索引：只解析新增或修改时间变化的文件，并移除已删除的聊天。
+        首次运行时相当于一次完整扫描，之后每次启动只需 stat 各文件。
+        文件读取在线程池中并发进行，以掩盖慢速磁盘或网络目录的打开延迟；索引写入仍在当前线程。
+        """
+        files = {}  # 聊天 ID -> 文件（JSONL 优先于旧版 JSON）
+        for file in self.storage_dir.iterdir():  # 一次遍历，按后缀筛选，无需通配符匹配
+            if file.suffix == ".jsonl":
+                files[file.stem] = file
+            elif file.suffix == ".json" and not file.name.endswith(META_SUFFIX):  # 跳过元数据文件
+                files.setdefault(file.stem, file)
+
+        indexed = dict(self.db.execute("SELECT id, mtime FROM chats"))  # 聊天 ID -> 索引时的文件修改时间
+        with ThreadPoolExecutor(max_workers=8) as executor:  # 并发读取所有聊天文件
+            results = list(executor.map(
+                lambda item: self._parse_one(item[0], item[1], indexed.get(item[0])),
+                files.items()
+            ))
+
+        self.db.execute("BEGIN")
+        try:
+            for result in results:
+                if result is not None:  # 新增或已修改的聊天
+                    self._index_chat(*result)
+            for chat_id in indexed.keys() - files.keys():  # 文件已不存在
+                self.db.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
+            self.db.execute("COMMIT")
+        except BaseException:  # 任何异常都回滚后继续抛出
+            self.db.execute("ROLLBACK")
+            raise
+        self._list_cache = None  # 使聊天列表缓存失效
+
     def get_chat_list(self) -> List[Dict]:
         """
         获取所有聊天历史的简要信息列表（用于侧边栏展示）。
         每个聊天以第一条用户消息为标题。
+        数据来自 SQLite 索引，结果会被缓存，仅在聊天增删改后重新查询。
         """
+        self.flush()  # 确保当前聊天的元数据已写入
+        if self._list_cache is not None:  # 命中缓存
+            return self._list_cache
+
         chats = []  # 聊天列表
-        for file in self.storage_dir.glob("*.json"):  # 遍历所有聊天文件
-            try:
-                with open(file, "r", encoding="utf-8") as f:  # 打开文件
-                    data = json.load(f)  # 解析 JSON
-                    
-                    # 获取第一条用户消息作为标题
-                    title = "新聊天"
-                    for msg in data["messages"]:
-                        if msg["role"] == "user":
-                            title = msg["content"].strip()
-                            if len(title) > 30:
-                                title = title[:27] + "..."
-                            break
-                    
-                    # 解析时间
-                    created_time = datetime.fromisoformat(data.get("created", "2023-01-01T00:00:00"))
-                    modified_time = datetime.fromisoformat(data.get("last_modified", "2023-01-01T00:00:00"))
-                    
-                    chats.append({
-                        "id": data["id"],
-                        "title": title,
-                        "created": created_time.strftime("%Y-%m-%d %H:%M"),
-                        "modified": modified_time.strftime("%Y-%m-%d %H:%M"),
-                        "message_count": len(data["messages"])
-                    })
-            except:
-                continue  # 解析失败跳过
-        
-        # 按修改时间倒序排列
-        return sorted(chats, key=lambda x: x["modified"], reverse=True)
-    
-    def add_message(self, role: str, content: str):
-        """向当前聊天添加一条消息，并自动保存"""
-        self.current_chat.append({
+        with self._write_lock:
+            rows = self.db.execute(  # 按修改时间倒序排列
+                "SELECT id, title, created, modified, message_count FROM chats ORDER BY modified DESC"
+            ).fetchall()
+        for chat_id, title, created, modified, message_count in rows:
+            chats.append({
+                "id": chat_id,
+                "title": title,
+                # ISO 时间前 16 位即 "YYYY-MM-DDTHH:MM"，直接截取，无需解析
+                "created": created[:16].replace("T", " "),
+                "modified": modified[:16].replace("T", " "),
+                "message_count": message_count
+            })
+        self._list_cache = chats
+        return self._list_cache
+
+    def add_message_sync(self, role: str, content: str):
+        """向当前聊天添加一条消息（仅更新内存），文件由 flush / persist 写入"""
+        message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
-        self.save_chat()  # 自动保存
-    
+            "timestamp": time.time()  # Unix 时间戳，展示时再格式化
+        }
+        with self._write_lock:
+            self.current_chat.append(message)
+            if role == "user" and self._title is None:  # 第一条用户消息作为标题
+                self._title = self._make_title(content)
+            self._pending_messages.append(message)  # 排队等待写入
+            self._save_pending = True  # 元数据一并更新
+            self._list_cache = None  # 使聊天列表缓存失效
+
+    def add_message_to(self, chat_id: str, role: str, content: str) -> bool:
+        """
+        向指定聊天添加一条消息。是当前聊天时等同于 add_message_sync；
+        否则（如切换聊天后才收到的回复）直接追加写入该聊天的文件并更新元数据。
+        该聊天已被删除或文件无法读取时丢弃消息，返回 False。
+        """
+        with self._write_lock:
+            if chat_id == self.current_chat_id:
+                self.add_message_sync(role, content)
+                return True
+
+            message = {
+                "role": role,
+                "content": content,
+                "timestamp": time.time()  # Unix 时间戳，展示时再格式化
+            }
+            chat_file = self._chat_file(chat_id)  # 切换聊天前已 flush，文件必然是 JSONL
+            try:
+                if not self._append_lines(chat_file, [message]):
+                    return False
+                summary = self._chat_summary(chat_file)  # 重新统计标题和消息数
+                self._write_meta({**summary, "last_modified": datetime.now().isoformat()})
+            except (OSError, ValueError, KeyError, TypeError):
+                return False
+            self._list_cache = None  # 使聊天列表缓存失效
+            return True
+
+    def add_message(self, role: str, content: str):
+        """向当前聊天添加一条消息，并立即写入文件"""
+        self.add_message_sync(role, content)
+        self.flush()
+
+    def close(self):
+        """写入待保存的元数据并关闭索引数据库，应用退出时调用"""
+        self.flush()
+        self.db.close()
+
     def delete_chat(self, chat_id: str) -> bool:
         """删除指定聊天ID的聊天记录文件"""
-        chat_file = self.storage_dir / f"{chat_id}.json"  # 聊天文件路径
-        if chat_file.exists():  # 文件存在
+        self.flush()  # 避免删除后又写回元数据
+        chat_files = [
+            f for f in (self._chat_file(chat_id), self._legacy_chat_file(chat_id), self._meta_file(chat_id))
+            if f.exists()
+        ]
+        if chat_files:  # 文件存在
             try:
-                chat_file.unlink()  # 删除文件
+                for chat_file in chat_files:
+                    chat_file.unlink()  # 删除文件
+                with self._write_lock:
+                    self.db.execute("DELETE FROM chats WHERE id = ?", (chat_id,))  # 从索引移除
+                self._list_cache = None  # 使聊天列表缓存失效
                 return True
-            except:
+            except (OSError, sqlite3.Error):
                 return False  # 删除失败
         return False  # 文件不存在
 
+def _build_panel(role: str, content: str, timestamp: str) -> Panel:
+    """构造单条消息的 Rich 面板，区分用户和 AI 样式"""
+    if role == "user":  # 用户消息样式
+        return Panel(
+            content,
+            title=f"You [{timestamp}]",
+            title_align="right",
+            style="bold blue",
+            border_style="blue",
+            width=80,
+            padding=(0, 1, 1, 1)
+        )
+    md = Markdown(content)  # AI 消息渲染为 Markdown
+    return Panel(
+        md,
+        title=f"DeepSeek AI [{timestamp}]",
+        style="bold green",
+        border_style="green",
+        width=80,
+        padding=(0, 1, 1, 1)
+    )
+
+@lru_cache(maxsize=512)
+def _render_panel(role: str, content: str, timestamp: str) -> Panel:
+    """
+    带 LRU 缓存的消息面板构造，重新加载历史聊天时避免重复解析 Markdown。
+    流式输出中的中间内容不经过此缓存。
+    """
+    return _build_panel(role, content, timestamp)
+
+class StreamingMessage(Static):
+    """
+    流式输出中的 AI 消息，累积已收到的内容并原地重新渲染。
+    """
+    def __init__(self, timestamp: str):
+        super().__init__(_build_panel("assistant", "", timestamp))
+        self.timestamp = timestamp  # 消息时间
+        self.buffer = ""  # 已收到的回复内容
+
 class ChatDisplay(Static):
     """
     聊天消息显示区域，负责将用户和 AI 消息以富文本面板形式展示。
     """
-    def add_message(self, role: str, content: str):
-        """添加一条消息到显示区域，区分用户和 AI 样式"""
-        timestamp = datetime.now().strftime("%H:%M:%S")  # 当前时间
-        
-        if role == "user":  # 用户消息样式
-            panel = Panel(
-                content,
-                title=f"You [{timestamp}]",
-                title_align="right",
-                style="bold blue",
-                border_style="blue",
-                width=80,
-                padding=(0, 1, 1, 1)
-            )
-        else:  # AI 消息样式
-            md = Markdown(content)  # 渲染为 Markdown
-            panel = Panel(
-                md,
-                title=f"DeepSeek AI [{timestamp}]",
-                style="bold green",
-                border_style="green",
-                width=80,
-                padding=(0, 1, 1, 1)
-            )
-        
+    def add_message(self, role: str, content: str, timestamp: Union[float, str, None] = None):
+        """添加一条消息到显示区域，区分用户和 AI 样式；未提供时间戳时使用当前时间"""
+        timestamp = _format_time(timestamp)  # 消息时间
+        panel = _render_panel(role, content, timestamp)
         self.mount(Static(panel))  # 将 Rich Panel 包装在 Static 组件中
         self.call_after_refresh(self.scroll_end)  # 滚动到底部
-    
+
+    def add_messages_bulk(self, msgs: List[Tuple[str, str, Union[float, str, None]]]):
+        """一次性挂载多条消息 (角色, 内容, 时间戳)，只触发一次布局刷新"""
+        statics = [Static(_render_panel(role, content, _format_time(ts))) for role, content, ts in msgs]
+        self.mount_all(statics)
+        self.call_after_refresh(self.scroll_end)  # 滚动到底部
+
+    def start_ai_message(self) -> StreamingMessage:
+        """挂载一条空的 AI 消息，返回用于追加内容的句柄"""
+        handle = StreamingMessage(datetime.now().strftime("%H:%M:%S"))
+        self.mount(handle)
+        self.call_after_refresh(self.scroll_end)  # 滚动到底部
+        return handle
+
+    def append_to_ai_message(self, handle: StreamingMessage, delta: str):
+        """向流式 AI 消息追加内容，并重新渲染 Markdown"""
+        handle.buffer += delta
+        handle.update(_build_panel("assistant", handle.buffer, handle.timestamp))
+        self.call_after_refresh(self.scroll_end)  # 滚动到底部
+
     def scroll_end(self):
         """滚动到底部，确保最新消息可见"""
         self.scroll_to(0, 10000, animate=False)
@@ -291,6 +906,70 @@ class ChatHistoryList(ListView):
             chat_id = event.item.chat_id  # 获取聊天 ID
             self.post_message(self.ChatSelected(chat_id))  # 发送消息
 
+class ConfirmScreen(ModalScreen[bool]):
+    """
+    确认对话框，以模态屏幕形式显示，不阻塞事件循环。
+    确认时返回 True，取消时返回 False。
+    """
+    DEFAULT_CSS = """
+    ConfirmScreen {
+        align: center middle;
+    }
+
+    #confirm-dialog {
+        width: 60;
+        height: auto;
+        padding: 1 2;
+        border: thick $accent;
+        background: $surface;
+    }
+
+    #confirm-message {
+        width: 100%;
+        margin-bottom: 1;
+    }
+
+    #confirm-buttons {
+        width: 100%;
+        height: auto;
+        align: center middle;
+    }
+
+    #confirm-buttons Button {
+        margin: 0 1;
+    }
+    """
+
+    BINDINGS = [
+        ("y", "confirm", "确认"),
+        ("n,escape", "cancel", "取消"),
+    ]
+
+    def __init__(self, message: str):
+        super().__init__()  # 父类初始化
+        self.message = message  # 提示信息
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="confirm-dialog"):
+            yield Label(self.message, id="confirm-message")  # 提示信息
+            with Horizontal(id="confirm-buttons"):
+                yield Button("确定", id="confirm-yes", variant="error")  # 确认按钮
+                yield Button("取消", id="confirm-no", variant="primary")  # 取消按钮
+
+    def on_mount(self) -> None:
+        self.query_one("#confirm-no").focus()  # 默认聚焦取消，避免误删
+
+    def on_button_pressed(self, event: Button.Pressed):
+        """按钮点击后关闭对话框并返回结果"""
+        event.stop()
+        self.dismiss(event.button.id == "confirm-yes")
+
+    def action_confirm(self):
+        self.dismiss(True)
+
+    def action_cancel(self):
+        self.dismiss(False)
+
 class StatusBar(Static):
     """
     状态栏组件，用于显示应用当前状态或提示信息。
@@ -394,6 +1073,7 @@ class DeepSeekApp(App):
         self.client = DeepSeekClient(api_key)  # DeepSeek API 客户端
         self.history = ChatHistory()           # 聊天历史管理
         self.current_chat_id = None            # 当前聊天ID
+        self._flush_timer = None               # 元数据延迟写入定时器
     
     def compose(self) -> ComposeResult:
         """
@@ -434,6 +1114,27 @@ class DeepSeekApp(App):
         # 设置焦点到输入框
         self.query_one("#chat-input").focus()
     
+    async def on_unmount(self) -> None:
+        """
+        应用卸载时写入未保存的元数据，并关闭索引数据库和 API 客户端的连接池。
+        """
+        self.history.close()
+        await self.client.aclose()
+
+    def schedule_history_flush(self):
+        """
+        延迟 0.5 秒写入聊天记录，合并短时间内的连续保存。
+        """
+        if self._flush_timer is None:
+            self._flush_timer = self.set_timer(0.5, self.flush_history)
+
+    def flush_history(self):
+        """
+        定时器回调：在后台线程中写入待保存的聊天记录，界面无需等待磁盘。
+        """
+        self._flush_timer = None
+        self.run_worker(self.history.persist(), exclusive=False)
+
     def load_chat_history(self):
         """
         加载聊天历史到侧边栏列表。
@@ -461,7 +1162,8 @@ class DeepSeekApp(App):
         """
         向当前聊天添加消息，并同步到显示区。
         """
-        self.history.add_message(role, content)  # 添加到历史
+        self.history.add_message_sync(role, content)  # 添加到历史
+        self.schedule_history_flush()  # 稍后在后台写入文件
         self.query_one("#chat-display").add_message(role, content)  # 添加到显示区
         self.query_one("#status-bar").status = f"消息已添加 | 当前聊天: {self.current_chat_id}"
     
@@ -506,18 +1208,38 @@ class DeepSeekApp(App):
         self.query_one("#send-button").disabled = True
         self.query_one("#chat-input").disabled = True
         
+        chat_id = self.history.current_chat_id  # 请求所属的聊天，等待期间用户可能切换聊天
+        chat_display = self.query_one("#chat-display")  # 聊天显示区
+        handle = None  # 流式 AI 消息句柄，收到首段内容时创建
+        parts = []  # 已收到的回复片段
         try:
-            # 调用 API
-            content, error = self.client.chat(self.history.current_chat)
-            
-            if error:
-                self.show_error(error)
-            elif content:
-                # 添加 AI 响应
-                self.add_message_to_chat("assistant", content)
+            # 调用 API，边接收边渲染
+            async for delta in self.client.chat(list(self.history.current_chat)):
+                parts.append(delta)
+                if self.history.current_chat_id != chat_id:  # 已切换到其他聊天，不再渲染
+                    continue
+                if handle is None or not handle.is_attached:  # 首段内容，或重新选中该聊天后句柄已被清除
+                    handle = chat_display.start_ai_message()
+                    delta = "".join(parts)  # 补上此前收到的全部内容
+                chat_display.append_to_ai_message(handle, delta)
+
+            if parts:
+                # 回复完整后再写入所属聊天的历史
+                reply = "".join(parts)
+                if chat_id == self.history.current_chat_id:
+                    if handle is None or not handle.is_attached:  # 重新选中该聊天后没有新的增量可渲染
+                        chat_display.add_message("assistant", reply)
+                    self.history.add_message_sync("assistant", reply)
+                    self.schedule_history_flush()  # 稍后在后台写入文件
+                    self.query_one("#status-bar").status = f"消息已添加 | 当前聊天: {self.current_chat_id}"
+                elif self.history.add_message_to(chat_id, "assistant", reply):
+                    self.query_one("#status-bar").status = f"回复已保存到聊天: {chat_id}"
+                    self.load_chat_history()  # 刷新侧边栏中的消息数
             else:
                 self.show_error("未收到有效响应")
-                
+
+        except DeepSeekAPIError as e:
+            self.show_error(str(e))
         except Exception as e:
             self.show_error(f"请求失败: {str(e)}")
         finally:
@@ -527,12 +1249,12 @@ class DeepSeekApp(App):
             self.query_one("#chat-input").disabled = False
             self.query_one("#chat-input").focus()
     
-    def confirm_dialog(self, message: str) -> bool:
+    async def confirm_dialog(self, message: str) -> bool:
         """
-        简易确认对话框（终端输入版）。
+        弹出模态确认对话框并等待结果（需在 worker 中调用）。
         """
-        self.query_one("#status-bar").status = f"{message} [按 Y 确认，其他键取消]"
-        return input(f"{message} [y/N] ").strip().lower() == 'y'  # 终端输入
+        self.query_one("#status-bar").status = f"{message} [按 Y 确认，N 或 Esc 取消]"
+        return await self.push_screen_wait(ConfirmScreen(message))
     
     def action_new_chat(self):
         """
@@ -540,18 +1262,21 @@ class DeepSeekApp(App):
         """
         self.create_new_chat()
     
-    def action_delete_chat(self):
+    @work(exclusive=True, group="confirm")
+    async def action_delete_chat(self):
         """
         删除当前聊天快捷键操作。
         """
         if self.current_chat_id:
-            if self.confirm_dialog(f"确定要删除当前聊天 '{self.current_chat_id}' 吗?"):
+            if await self.confirm_dialog(f"确定要删除当前聊天 '{self.current_chat_id}' 吗?"):
                 if self.history.delete_chat(self.current_chat_id):
                     self.query_one("#status-bar").status = f"聊天 '{self.current_chat_id}' 已删除"
                     self.create_new_chat()
                     self.load_chat_history()
                 else:
                     self.show_error("删除聊天失败")
+            else:
+                self.query_one("#status-bar").status = "已取消删除"
 
     @on(Button.Pressed, "#new-chat")
     def on_new_chat(self):
@@ -589,8 +1314,9 @@ class DeepSeekApp(App):
             self.current_chat_id = event.chat_id  # 设置当前聊天 ID
             chat_display = self.query_one("#chat-display")  # 获取显示区
             chat_display.clear_chat()  # 清空显示区
-            for msg in self.history.current_chat:  # 加载历史消息
-                chat_display.add_message(msg["role"], msg["content"])
+            chat_display.add_messages_bulk([  # 批量加载历史消息
+                (msg["role"], msg["content"], msg.get("timestamp")) for msg in self.history.current_chat
+            ])
             self.query_one("#chat-input").focus()  # 聚焦输入框
             self.query_one("#status-bar").status = f"已加载聊天: {self.current_chat_id}"
     
@@ -615,8 +1341,8 @@ def load_api_key() -> Optional[str]:
 
     if CONFIG_FILE.exists():  # 配置文件存在
         try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
+            with open(CONFIG_FILE, "rb") as f:
+                cfg = _json_loads(f.read())
                 return cfg.get("api_key")
         except json.JSONDecodeError:
             console.print("[bold red]警告: 配置文件格式错误，无法读取 API 密钥[/bold red]")
@@ -627,8 +1353,8 @@ def save_api_key(api_key: str):
     保存 API 密钥到本地配置文件。
     """
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump({"api_key": api_key}, f, ensure_ascii=False, indent=2)
+    with open(CONFIG_FILE, "wb") as f:
+        f.write(_json_dumps({"api_key": api_key}, pretty=True))
 
 def main():
     """